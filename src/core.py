@@ -1,27 +1,87 @@
+import io
 import os
-import re
 import asyncio
+import random
+import hashlib
 import aiohttp
+from dataclasses import asdict
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
 from typing import List, Dict, Tuple, Optional
 from .models import ProcessingError
-from .utils import logger
+from .utils import (
+    logger, prepare_code, json_loads, json_dumps,
+    compress_text, decompress_text, read_text_async, write_text_async, CreditSemaphore
+)
 from .config import DEFAULT_GAME_CONTEXT
 import json
 
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+MAX_ATTEMPTS = 5
+MAX_RETRY_AFTER = 60  # Seconds; longer server hints would stall a chunk and its credits
+MAX_ERROR_PROMPT = 4 * 1024  # Prompt excerpt kept in error reports
+ANALYSIS_MARKER = "\n## Analysis:\n"
+
 class GameCodeProcessor:
-    def __init__(self, api_key: str, max_workers: int = 8, start_from = 0, game_context: str = "", module_name: str = ""):
+    def __init__(self, api_key: str, max_workers: int = 8, start_from = 0, game_context: str = "", module_name: str = "",
+                 tokens_per_minute: int = 0):
         self.api_key = api_key
         self.max_workers = max_workers
+        # Caps concurrent sockets; token credits (if enabled) pace the per-minute quota
+        self.request_semaphore = asyncio.Semaphore(max_workers)
+        # Bounds packed-but-unfinished chunks so ingest cannot outrun the API
+        self.chunk_slots = asyncio.Semaphore(max_workers * 2)
+        self.token_credits = CreditSemaphore(tokens_per_minute) if tokens_per_minute > 0 else None
         self.game_context = game_context or DEFAULT_GAME_CONTEXT
-        self.start_from = start_from
+        if start_from:
+            logger.warning("start_from is ignored: unchanged chunks are now reused automatically by content hash")
         self.module_name = module_name or "Assembly-CSharp"
         self.errors: List[ProcessingError] = []
         self.session: Optional[aiohttp.ClientSession] = None
-        self.file_counter = 0
+        self.cache_dir: Optional[Path] = None
+        self._response_cache: Dict[str, str] = {}
+        
+        # Constant per instance; built once instead of on every API call
+        self._sys_many = (
+            f"{self.game_context}\n\n"
+            "Analyze these code files technically. For each:\n"
+            "1. If under 10 lines: Show exact structure\n"
+            "2. Otherwise: Describe concrete implementation\n\n"
+            "Format:\n"
+            "- [filename]: [Specific technical content]\n\n"
+            "Examples:\n"
+            "- PoseType.cs: Bit flag Enum {{stand,crouch,down,back}}\n"
+            "- DamageSystem.cs: Calculates damage using Attack-Defense formula\n"
+            "- Inventory.cs: Dictionary<ItemID, int> with serialization"
+        )
+        self._sys_deep = (
+            f"{self.game_context}\n\n"
+            "Analyze this code module in depth:\n"
+            "1. Technical architecture (classes, patterns)\n"
+            "2. Implementation details\n"
+            "3. Game-specific adaptations\n\n"
+            "Omit trivial details but cover all key components."
+        )
+        self._payload_template = {
+            "model": "deepseek-chat",
+            "temperature": 0.3,
+            "max_tokens": 8192  # Using full context window
+        }
+        # Folded into chunk IDs so saved analyses are only reused under the same prompts and model
+        self._prompt_fingerprint = json.dumps(
+            [self._sys_many, self._sys_deep, self._payload_template], sort_keys=True
+        ).encode('utf-8')
     
     async def __aenter__(self):
+        # Single-host workload: keep TLS connections alive between chunks and cache DNS
+        connector = aiohttp.TCPConnector(
+            limit=self.max_workers * 2,
+            limit_per_host=self.max_workers * 2,
+            ttl_dns_cache=300,
+            keepalive_timeout=120
+        )
         self.session = aiohttp.ClientSession(
+            connector=connector,
             headers={"Authorization": f"Bearer {self.api_key}"},
             timeout=aiohttp.ClientTimeout(total=60*10)  # 10 minutes timeout
         )
@@ -36,27 +96,36 @@ class GameCodeProcessor:
         self.errors.append(error)
         logger.error(f"Error processing {file_path}: {error_type} - {error_msg}")
     
-    def preprocess_code(self, code: str) -> str:
-        """Clean code while preserving structure"""
+    def _cache_path(self, key: str) -> Optional[Path]:
+        if self.cache_dir is None:
+            return None
+        return self.cache_dir / key[:2] / f"{key}.z"
+
+    def _read_cache(self, key: str) -> Optional[str]:
+        """Look up a cached response, memory first, then disk"""
+        if key in self._response_cache:
+            return self._response_cache[key]
+        cache_path = self._cache_path(key)
+        if cache_path is None or not cache_path.exists():
+            return None
         try:
-            # Remove comments but keep #regions and #defines
-            lines = []
-            for line in code.split('\n'):
-                stripped = line.strip()
-                if stripped.startswith('//'):
-                    continue
-                if '//' in line:
-                    line = line.split('//')[0]
-                if line.strip():
-                    lines.append(line)
-            
-            # Remove duplicate blank lines
-            cleaned = '\n'.join(lines)
-            cleaned = re.sub(r'\n{3,}', '\n\n', cleaned)
-            return cleaned
+            content = decompress_text(cache_path.read_bytes())
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable cache entry {key}: {str(e)}")
+            return None
+        self._response_cache[key] = content
+        return content
+
+    def _write_cache(self, key: str, content: str):
+        self._response_cache[key] = content
+        cache_path = self._cache_path(key)
+        if cache_path is None:
+            return
+        try:
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            cache_path.write_bytes(compress_text(content))
         except Exception as e:
-            logger.warning(f"Preprocessing error: {str(e)}")
-            return code
+            logger.warning(f"Cache write failed for {key}: {str(e)}")
 
     async def analyze_with_deepseek(self, prompt: str, is_many_files: bool, chunk_size: int) -> str:
         """Analyze with precise technical focus and game context hints"""
@@ -64,177 +133,363 @@ class GameCodeProcessor:
             raise RuntimeError("Session not initialized")
         
         try:
-            if is_many_files:
-                system_message = (
-                    f"{self.game_context}\n\n"
-                    "Analyze these code files technically. For each:\n"
-                    "1. If under 10 lines: Show exact structure\n"
-                    "2. Otherwise: Describe concrete implementation\n\n"
-                    "Format:\n"
-                    "- [filename]: [Specific technical content]\n\n"
-                    "Examples:\n"
-                    "- PoseType.cs: Bit flag Enum {{stand,crouch,down,back}}\n"
-                    "- DamageSystem.cs: Calculates damage using Attack-Defense formula\n"
-                    "- Inventory.cs: Dictionary<ItemID, int> with serialization"
-                )
-            else:
-                system_message = (
-                    f"{self.game_context}\n\n"
-                    "Analyze this code module in depth:\n"
-                    "1. Technical architecture (classes, patterns)\n"
-                    "2. Implementation details\n"
-                    "3. Game-specific adaptations\n\n"
-                    "Omit trivial details but cover all key components."
-                )
+            system_message = self._sys_many if is_many_files else self._sys_deep
+            payload = dict(self._payload_template, messages=[
+                {"role": "system", "content": system_message},
+                {"role": "user", "content": prompt}
+            ])
             
-            payload = {
-                "model": "deepseek-chat",
-                "messages": [
-                    {"role": "system", "content": system_message},
-                    {"role": "user", "content": prompt}
-                ],
-                "temperature": 0.3,
-                "max_tokens": 8192  # Using full context window
-            }
+            # Identical requests yield reusable answers, so skip the round-trip
+            key = hashlib.sha256(json.dumps({
+                "model": payload["model"],
+                "sys": system_message,
+                "user": prompt,
+                "t": payload["temperature"]
+            }, sort_keys=True).encode('utf-8')).hexdigest()
+            cached = await asyncio.to_thread(self._read_cache, key)
+            if cached is not None:
+                return cached
+            
+            # ~4 chars per token is close enough for quota pacing
+            token_estimate = (len(system_message) + len(prompt)) // 4
+            content = await self._request_with_retry(payload, token_estimate)
             
+            await asyncio.to_thread(self._write_cache, key, content)
+            return content
+        
+        except Exception as e:
+            raise RuntimeError(f"API request failed: {str(e)}")
+
+    async def _request_with_retry(self, payload: Dict, token_estimate: int) -> str:
+        """Retry transient failures (timeouts, 429, 5xx) with exponential backoff"""
+        for attempt in range(MAX_ATTEMPTS):
+            try:
+                if self.token_credits:
+                    return await self.token_credits.transact(
+                        self._post_completion(payload), credits=token_estimate, refund_time=60
+                    )
+                return await self._post_completion(payload)
+            except (aiohttp.ClientResponseError, asyncio.TimeoutError) as e:
+                if isinstance(e, aiohttp.ClientResponseError) and e.status not in RETRYABLE_STATUSES:
+                    raise
+                if attempt == MAX_ATTEMPTS - 1:
+                    raise
+                delay = self._retry_delay(e, attempt)
+                logger.warning(f"Transient API failure ({e!r}), retrying in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    @staticmethod
+    def _retry_delay(error: Exception, attempt: int) -> float:
+        headers = getattr(error, 'headers', None)
+        if headers and headers.get('Retry-After'):
+            try:
+                requested = float(headers['Retry-After'])
+            except ValueError:
+                pass
+            else:
+                delay = min(max(requested, 0.0), MAX_RETRY_AFTER)
+                if delay != requested:
+                    logger.warning(f"Clamping Retry-After of {requested}s to {delay:.1f}s")
+                return delay
+        return min(30, 2 ** attempt) + random.random()
+
+    async def _post_completion(self, payload: Dict) -> str:
+        async with self.request_semaphore:
             async with self.session.post(
                 "https://api.deepseek.com/v1/chat/completions",
-                json=payload
+                data=json_dumps(payload),
+                headers={"Content-Type": "application/json"}
             ) as response:
                 response.raise_for_status()
-                result = await response.json()
+                result = json_loads(await response.read())
                 return result['choices'][0]['message']['content']
-        
-        except Exception as e:
-            raise RuntimeError(f"API request failed: {str(e)}")
 
-    async def process_chunk(self, chunk: List[Tuple[Path, str]], output_dir: Path) -> Dict:
-        """Process a chunk and return analysis metadata"""
-        self.file_counter += len(chunk)
-        chunk_id = f"{self.file_counter:06d}"
-        output_path = output_dir / f"analysis_{chunk_id}.md"
+    def chunk_id_for(self, chunk: List[Tuple[Path, str]]) -> str:
+        """Content-addressed chunk ID: hash of the prompt settings and the combined code"""
+        digest = hashlib.sha256(self._prompt_fingerprint)
+        for part in self.iter_chunk_parts(chunk):
+            digest.update(part.encode('utf-8'))
+        return digest.hexdigest()[:16]
 
-        if output_path.exists() and self.file_counter <= self.start_from:
-            with open(output_path, 'r', encoding='utf-8') as f:
-                existing_content = f.read()
-            return {
-                'chunk_id': chunk_id,
-                'files': [str(p) for p, _ in chunk],
-                'analysis': existing_content,
-                'directory': str(chunk[0][0].parent)
-            }
+    @staticmethod
+    def iter_chunk_parts(chunk: List[Tuple[Path, str]]):
+        """Yield the pieces of a chunk's combined code without building per-file copies"""
+        for i, (rel_path, content) in enumerate(chunk):
+            if i:
+                yield "\n\n"
+            yield "// File: "
+            yield str(rel_path)
+            yield "\n"
+            yield content
 
-        combined_code = "\n\n".join([f"// File: {rel_path}\n{content}" for rel_path, content in chunk])
+    async def process_chunk(self, chunk: List[Tuple[Path, str]], chunk_id: str, output_dir: Path) -> Dict:
+        """Process a chunk and return analysis metadata"""
+        files = [str(p) for p, _ in chunk]
+        directory = str(chunk[0][0].parent)
+        
+        # Content-addressed output: reruns reuse the analysis of any unchanged chunk
+        output_path = output_dir / f"analysis_{chunk_id}.md"
+        
+        if await asyncio.to_thread(output_path.exists):
+            try:
+                existing_content = await read_text_async(output_path)
+            except Exception as e:
+                # Treat a damaged saved analysis as a miss and regenerate it
+                logger.warning(f"Ignoring unreadable analysis {output_path}: {str(e)}")
+            else:
+                return {
+                    'chunk_id': chunk_id,
+                    'files': files,
+                    'analysis': existing_content.split(ANALYSIS_MARKER, 1)[-1],
+                    'directory': directory
+                }
+        
+        buf = io.StringIO()
+        for part in self.iter_chunk_parts(chunk):
+            buf.write(part)
+        combined_code = buf.getvalue()
         
         # Determine analysis type
         avg_size = sum(len(c[1]) for c in chunk) / len(chunk)
         is_many_files = len(chunk) > 5 and avg_size < 2000  # Many small files
         
+        # combined_code now holds everything; release the per-file strings before the API wait
+        chunk.clear()
+        
         try:
             analysis = await self.analyze_with_deepseek(combined_code, is_many_files, len(combined_code))
             
             # Save detailed analysis
-            with open(output_path, 'w', encoding='utf-8') as f:
-                f.write(f"# Technical Analysis - Chunk {chunk_id}\n\n")
-                f.write(f"**Files:** {len(chunk)} | **Total Size:** {len(combined_code)} chars\n\n")
-                f.write("\n## Analysis:\n")
-                f.write(analysis)
+            await write_text_async(
+                output_path,
+                f"# Technical Analysis - Chunk {chunk_id}\n\n",
+                f"**Files:** {len(files)} | **Total Size:** {len(combined_code)} chars\n\n",
+                ANALYSIS_MARKER,
+                analysis
+            )
             
             return {
                 'chunk_id': chunk_id,
-                'files': [str(p) for p, _ in chunk],
+                'files': files,
                 'analysis': analysis,
-                'directory': str(chunk[0][0].parent)
+                'directory': directory
             }
         except Exception as e:
             error_msg = (
                 f"API request failed for chunk {chunk_id}\n\n"
-                f"Prompt:\n{combined_code[:]}...\n\n"
+                f"Prompt:\n{combined_code[:MAX_ERROR_PROMPT]}...\n\n"
                 f"Error: {str(e)}"
             )
             self.record_error(f"chunk_{chunk_id}", "AnalysisError", error_msg)
             return {
                 'chunk_id': chunk_id,
+                'files': files,
                 'error': error_msg
             }
 
+    @classmethod
+    def iter_code_files(cls, directory: Path, failures: List[Tuple[str, str]]):
+        """Yield (path, byte size) for every .cs file below directory.
+
+        Unreadable or vanished entries are skipped and appended to ``failures``
+        so the caller can record them on the event loop thread.
+        """
+        try:
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            yield from cls.iter_code_files(Path(entry.path), failures)
+                        elif entry.name.endswith('.cs') and entry.is_file():
+                            yield Path(entry.path), entry.stat().st_size
+                    except OSError as e:
+                        failures.append((entry.path, str(e)))
+        except OSError as e:
+            failures.append((str(directory), str(e)))
+
+    @staticmethod
+    def read_code_file(full_path: Path) -> str:
+        """Read one source file (blocking; run in a worker thread)"""
+        with open(full_path, 'r', encoding='utf-8') as f:
+            return f.read()
+
+    async def dispatch_chunk(self, chunk: List[Tuple[Path, str]], output_dir: Path) -> asyncio.Task:
+        # Wait for a free slot first, so packing (and reading ahead) pauses while the API is busy
+        await self.chunk_slots.acquire()
+        # IDs are fixed when the chunk is packed, independent of task completion order
+        chunk_id = self.chunk_id_for(chunk)
+        task = asyncio.create_task(self.process_chunk(chunk, chunk_id, output_dir))
+        task.add_done_callback(lambda _: self.chunk_slots.release())
+        return task
+
     async def process_directory(self, root_dir: Path):
         """Process all code with enhanced technical focus"""
         analysis_dir = root_dir / "technical_analysis"
         analysis_dir.mkdir(exist_ok=True)
+        self.cache_dir = analysis_dir / ".llm_cache"
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
         
-        # First pass: Collect all files with size
-        all_files = []
-        for dirpath, _, filenames in os.walk(root_dir):
-            for filename in filenames:
-                if filename.endswith('.cs'):
-                    full_path = Path(dirpath) / filename
-                    try:
-                        with open(full_path, 'r', encoding='utf-8') as f:
-                            content = f.read()
-                        cleaned = self.preprocess_code(content)
-                        all_files.append((
-                            full_path,
-                            full_path.relative_to(root_dir),
-                            cleaned,
-                            len(cleaned.encode('utf-8'))
-                        ))
-                    except Exception as e:
-                        self.record_error(str(full_path), "FileReadError", str(e))
+        # First pass: Collect paths with on-disk size only; contents are loaded on demand
+        scan_failures: List[Tuple[str, str]] = []
+        code_files = await asyncio.to_thread(lambda: list(self.iter_code_files(root_dir, scan_failures)))
+        for path, error in scan_failures:
+            self.record_error(path, "FileReadError", error)
         
-        # Sort by directory then size (small files first)
-        all_files.sort(key=lambda x: (str(x[0].parent), x[3]))
+        # Sort by directory then size (small files first); the name breaks ties so
+        # packing, and with it every chunk ID, doesn't depend on filesystem order
+        code_files.sort(key=lambda x: (str(x[0].parent), x[1], x[0].name))
         
-        # Create chunks with directory affinity
-        chunks = []
-        current_chunk = []
-        current_size = 0
-        MAX_CHUNK_SIZE = 120 * 1024  # 120KB to stay under token limit
-        MAX_CHUNK_NUM = 8
+        # Reads run in threads and CPU-bound preprocessing across processes.
+        # The queue holds pending reads in sorted order, bounding how many file
+        # bodies are resident; dispatch_chunk blocks while all chunk slots are
+        # busy, so the producer in turn stalls on the full queue.
+        read_queue = asyncio.Queue(maxsize=64)
+        loop = asyncio.get_running_loop()
         
-        for full_path, rel_path, content, size in all_files:
-            if len(current_chunk) > MAX_CHUNK_NUM or current_size + size > MAX_CHUNK_SIZE and current_chunk:
-                chunks.append(current_chunk)
-                current_chunk = []
-                current_size = 0
+        # Default sizing is the CPU count, capped at 61 where Windows requires it
+        with ProcessPoolExecutor() as pool:
+            async def read_one(full_path: Path):
+                try:
+                    content = await asyncio.to_thread(self.read_code_file, full_path)
+                except Exception as e:
+                    self.record_error(str(full_path), "FileReadError", str(e))
+                    return None
+                cleaned, tokens, digest = await loop.run_in_executor(pool, prepare_code, content)
+                return full_path.relative_to(root_dir), cleaned, tokens, digest
             
-            current_chunk.append((rel_path, content))
-            current_size += size
-        
-        if current_chunk:
-            chunks.append(current_chunk)
+            async def produce():
+                for full_path, _ in code_files:
+                    await read_queue.put(asyncio.ensure_future(read_one(full_path)))
+                await read_queue.put(None)
+            
+            producer = asyncio.create_task(produce())
+            
+            # Create chunks with directory affinity, dispatching each as soon as it is full
+            chunk_tasks = []
+            # Identical cleaned files are analyzed once; copies reuse the first one's analysis
+            seen: Dict[str, Path] = {}
+            duplicates: Dict[str, List[str]] = {}
+            current_chunk = []
+            current_tokens = 0
+            MAX_CHUNK_TOKENS = 48000  # Leaves room for the system prompt and 8192 output tokens
+            MAX_CHUNK_NUM = 8
+            
+            pending = None
+            try:
+                while (pending := await read_queue.get()) is not None:
+                    entry = await pending
+                    if entry is None:
+                        continue
+                    rel_path, content, tokens, digest = entry
+                    
+                    if digest in seen:
+                        duplicates.setdefault(str(seen[digest]), []).append(str(rel_path))
+                        continue
+                    seen[digest] = rel_path
+                    
+                    if (len(current_chunk) >= MAX_CHUNK_NUM or current_tokens + tokens > MAX_CHUNK_TOKENS) and current_chunk:
+                        chunk_tasks.append(await self.dispatch_chunk(current_chunk, analysis_dir))
+                        current_chunk = []
+                        current_tokens = 0
+                    
+                    current_chunk.append((rel_path, content))
+                    current_tokens += tokens
+                    # The chunk now owns the file body; drop the loop's references to it
+                    pending = entry = content = None
+                
+                if current_chunk:
+                    chunk_tasks.append(await self.dispatch_chunk(current_chunk, analysis_dir))
+            except BaseException:
+                # Don't leave dispatched chunks running after a failed ingest
+                for task in chunk_tasks:
+                    task.cancel()
+                await asyncio.gather(*chunk_tasks, return_exceptions=True)
+                raise
+            finally:
+                # Cancel the producer and any reads it queued but were never consumed
+                leftovers = [producer]
+                if pending is not None:
+                    leftovers.append(pending)
+                while not read_queue.empty():
+                    queued = read_queue.get_nowait()
+                    if queued is not None:
+                        leftovers.append(queued)
+                for future in leftovers:
+                    future.cancel()
+                await asyncio.gather(*leftovers, return_exceptions=True)
         
-        # Process chunks with enhanced parallelism
-        semaphore = asyncio.Semaphore(self.max_workers)
+        # API calls are rate limited internally
+        chunk_results = await asyncio.gather(*chunk_tasks, return_exceptions=True)
         
-        async def limited_task(chunk):
-            async with semaphore:
-                return await self.process_chunk(chunk, analysis_dir)
+        if duplicates:
+            duplicate_count = sum(len(copies) for copies in duplicates.values())
+            logger.info(f"Deduplicated {duplicate_count} of {len(code_files)} files")
+            chunk_results.extend(self.expand_duplicates(chunk_results, duplicates))
         
-        chunk_results = await asyncio.gather(
-            *[limited_task(chunk) for chunk in chunks],
-            return_exceptions=True
-        )
+        # Chunk outputs are named by content hash; record which files each one covers
+        chunk_index: Dict[str, List[str]] = {}
+        for result in chunk_results:
+            if isinstance(result, dict) and 'error' not in result:
+                chunk_index.setdefault(result['chunk_id'], []).extend(result['files'])
+        data = await asyncio.to_thread(json_dumps, chunk_index, True)
+        await asyncio.to_thread((analysis_dir / "chunk_index.json").write_bytes, data)
 
         print("chunks completed")
         
         # Generate directory summaries
-        await self.generate_directory_summaries(analysis_dir, chunk_results)
+        summaries = await self.generate_directory_summaries(analysis_dir, chunk_results)
         
         # Generate full architecture report
-        await self.generate_architecture_report(root_dir, chunk_results)
+        await self.generate_architecture_report(root_dir, chunk_results, summaries)
         
         # Save error report
         if self.errors:
-            with open(root_dir / "analysis_errors.json", 'w', encoding='utf-8') as f:
-                json.dump([e.__dict__ for e in self.errors], f, indent=2)
+            # Serialize and write in a worker thread; large reports would stall the loop
+            data = await asyncio.to_thread(lambda: json_dumps([asdict(e) for e in self.errors], True))
+            await asyncio.to_thread((root_dir / "analysis_errors.json").write_bytes, data)
+
+    def expand_duplicates(self, chunk_results: List[Dict], duplicates: Dict[str, List[str]]) -> List[Dict]:
+        """Credit skipped copies to the analysis of their first copy.
+
+        Copies in the same directory join that chunk's result; copies elsewhere
+        get pointer results naming the first copy and its chunk, without the
+        analysis itself, so their own directory's summary still lists them.
+        """
+        pointer_results = []
+        for result in chunk_results:
+            if not isinstance(result, dict):
+                continue
+            copies = [(path, copy) for path in result['files'] for copy in duplicates.get(path, ())]
+            if not copies:
+                continue
+            
+            if 'error' in result:
+                for _, copy in copies:
+                    self.record_error(
+                        copy, "AnalysisError",
+                        f"Duplicate file not analyzed: chunk {result['chunk_id']} holding its first copy failed"
+                    )
+                continue
+            
+            for original, copy in copies:
+                directory = str(Path(copy).parent)
+                if directory == result['directory']:
+                    result['files'].append(copy)
+                else:
+                    pointer_results.append({
+                        'chunk_id': result['chunk_id'],
+                        'files': [copy],
+                        'directory': directory,
+                        'duplicate_of': original
+                    })
+        return pointer_results
 
-    async def generate_directory_summaries(self, analysis_dir: Path, chunk_results: List[Dict]):
-        """Create per-directory technical summaries with AI analysis"""
+    async def generate_directory_summaries(self, analysis_dir: Path, chunk_results: List[Dict]) -> Dict[str, str]:
+        """Create per-directory technical summaries with AI analysis; returns them by directory"""
         dir_map = {}
         
         for result in chunk_results:
-            if 'error' in result:
+            if not isinstance(result, dict) or 'error' in result:
                 continue
             
             dir_path = result['directory']
@@ -242,65 +497,83 @@ class GameCodeProcessor:
                 dir_map[dir_path] = {
                     'chunks': [],
                     'files': set(),
-                    'analyses': []
+                    'analyses': [],
+                    'duplicates': []
                 }
             
-            dir_map[dir_path]['chunks'].append(result['chunk_id'])
             dir_map[dir_path]['files'].update(result['files'])
+            if 'duplicate_of' in result:
+                dir_map[dir_path]['duplicates'].append(
+                    f"- {result['files'][0]}: identical to {result['duplicate_of']}, see chunk {result['chunk_id']}"
+                )
+                continue
+            dir_map[dir_path]['chunks'].append(result['chunk_id'])
             dir_map[dir_path]['analyses'].append(result['analysis'])
         
-        # Process directories with AI summarization
-        for dir_path, data in dir_map.items():
-            summary_path = analysis_dir / f"summary_{Path(dir_path).name}.md"
-            
-            if len(data['chunks']) > 1:
-                # AI-generated summary for multi-chunk directories
-                prompt = (
-                    "Analyze these code chunks. Summarize:\n"
-                    "0. **Overall purpose of the module.**\n"
-                    "1. **Structure** - Core components, hierarchy, data flow\n"
-                    "2. **Modules** - files' purpose, key functions, interfaces\n"
-                    "3. **Connections** - Dependencies, external integrations\n\n"
-                    "**Rules:**\n"
-                    "- Group logically, not by chunk order.\n"
-                    "- Mark inferences clearly. Be technical, detailed and structured.\n\n"
-                    f"Directory: {dir_path}\n"
-                    f"Files: {len(data['files'])}\n\n"
-                    "Code chunks:\n"
-                    + "\n\n---\n\n".join(data['analyses'])
-                )
-                
-                try:
-                    summary = await self.analyze_with_deepseek(prompt, False, 0)
-                    with open(summary_path, 'w', encoding='utf-8') as f:
-                        f.write(f"# Directory Technical Summary: {dir_path}\n\n")
-                        f.write(f"**Total Files:** {len(data['files'])}\n")
-                        f.write(f"**Analysis Chunks:** {', '.join(data['chunks'])}\n\n")
-                        f.write(summary)
-                except Exception as e:
-                    error_msg = f"Directory summary failed:\n\nPrompt:\n{prompt}\n\nError: {str(e)}"
-                    self.record_error(str(summary_path), "SummaryError", error_msg)
-                    with open(summary_path, 'w', encoding='utf-8') as f:
-                        f.write(f"# Summary Generation Failed\n\n{error_msg}")
-            else:
-                # Single chunk - just store the analysis
-                with open(summary_path, 'w', encoding='utf-8') as f:
-                    f.write(f"# Single Chunk Analysis: {dir_path}\n\n")
-                    f.write(data['analyses'][0])
+        # Process directories with AI summarization concurrently; API calls share the request limiter
+        summaries = await asyncio.gather(
+            *[self._summarize_dir(dir_path, data, analysis_dir) for dir_path, data in dir_map.items()]
+        )
+        return dict(zip(dir_map, summaries))
 
-    async def generate_architecture_report(self, root_dir: Path, chunk_results: List[Dict]):
-        """Generate comprehensive technical architecture document"""
-        # Collect all summary files
-        summary_files = list((root_dir / "technical_analysis").glob("summary_*.md"))
-        summary_contents = []
+    async def _summarize_dir(self, dir_path: str, data: Dict, analysis_dir: Path) -> str:
+        """Summarize one directory's chunk analyses and write summary_<dir>.md"""
+        summary_path = analysis_dir / f"summary_{Path(dir_path).name}.md"
         
-        for sf in summary_files:
+        if len(data['chunks']) > 1:
+            # AI-generated summary for multi-chunk directories
+            buf = io.StringIO()
+            buf.write(
+                "Analyze these code chunks. Summarize:\n"
+                "0. **Overall purpose of the module.**\n"
+                "1. **Structure** - Core components, hierarchy, data flow\n"
+                "2. **Modules** - files' purpose, key functions, interfaces\n"
+                "3. **Connections** - Dependencies, external integrations\n\n"
+                "**Rules:**\n"
+                "- Group logically, not by chunk order.\n"
+                "- Mark inferences clearly. Be technical, detailed and structured.\n\n"
+                f"Directory: {dir_path}\n"
+                f"Files: {len(data['files'])}\n\n"
+                "Code chunks:\n"
+            )
+            for i, analysis in enumerate(data['analyses']):
+                if i:
+                    buf.write("\n\n---\n\n")
+                buf.write(analysis)
+            prompt = buf.getvalue()
+            
             try:
-                with open(sf, 'r', encoding='utf-8') as f:
-                    summary_contents.append(f.read())
+                summary = await self.analyze_with_deepseek(prompt, False, 0)
+                parts = [
+                    f"# Directory Technical Summary: {dir_path}\n\n",
+                    f"**Total Files:** {len(data['files'])}\n",
+                    f"**Analysis Chunks:** {', '.join(data['chunks'])}\n\n",
+                    summary
+                ]
             except Exception as e:
-                self.record_error(str(sf), "SummaryReadError", str(e))
+                error_msg = f"Directory summary failed:\n\nPrompt:\n{prompt[:MAX_ERROR_PROMPT]}...\n\nError: {str(e)}"
+                self.record_error(str(summary_path), "SummaryError", error_msg)
+                parts = [f"# Summary Generation Failed\n\n{error_msg}"]
+        elif data['chunks']:
+            # Single chunk - just store the analysis
+            parts = [
+                f"# Single Chunk Analysis: {dir_path}\n\n",
+                data['analyses'][0]
+            ]
+        else:
+            # Only copies of files analyzed elsewhere
+            parts = [f"# Duplicate Files: {dir_path}\n"]
         
+        if data['duplicates']:
+            parts.append("\n\n## Identical Copies\n\n")
+            parts.append('\n'.join(data['duplicates']))
+        
+        # Written for inspection; the architecture report uses the in-memory copy
+        await write_text_async(summary_path, *parts)
+        return ''.join(parts)
+
+    async def generate_architecture_report(self, root_dir: Path, chunk_results: List[Dict], summaries: Dict[str, str]):
+        """Generate comprehensive technical architecture document"""
         prompt = f"""
             Please read and organize the following code, and provide a detailed explanation of {self.module_name}. Output in English. 
 
@@ -312,25 +585,26 @@ class GameCodeProcessor:
             """
 
 
-        prompt_parts = [
-            f"{self.game_context}\n\n",
-            prompt,
-            "Directory summaries:\n"
-        ]
-        
-        prompt_parts.extend(f"\n=== {sf.name} ===\n{content[:]}"  # Truncate very long summaries
-                        for sf, content in zip(summary_files, summary_contents))
+        buf = io.StringIO()
+        buf.write(f"{self.game_context}\n\n")
+        buf.write(prompt)
+        buf.write("Directory summaries:\n")
+        for dir_path, content in summaries.items():
+            buf.write(f"\n=== summary_{Path(dir_path).name}.md ===\n")
+            buf.write(content)
+        report_prompt = buf.getvalue()
         
         try:
-            report = await self.analyze_with_deepseek(''.join(prompt_parts), False, 0)
+            report = await self.analyze_with_deepseek(report_prompt, False, 0)
             
-            with open(root_dir / "technical_architecture.md", 'w', encoding='utf-8') as f:
-                f.write("# Game Technical Architecture\n\n")
-                f.write(f"## Framework Context\n{self.game_context}\n\n")
-                f.write("## Comprehensive Code Structure Analysis\n\n")
-                f.write(report)
+            await write_text_async(
+                root_dir / "technical_architecture.md",
+                "# Game Technical Architecture\n\n",
+                f"## Framework Context\n{self.game_context}\n\n",
+                "## Comprehensive Code Structure Analysis\n\n",
+                report
+            )
         except Exception as e:
-            error_msg = f"Report generation failed:\n\nPrompt:\n{''.join(prompt_parts)[:]}...\n\nError: {str(e)}"
+            error_msg = f"Report generation failed:\n\nPrompt:\n{report_prompt[:MAX_ERROR_PROMPT]}...\n\nError: {str(e)}"
             self.record_error("technical_architecture.md", "ReportError", error_msg)
-            with open(root_dir / "technical_architecture.md", 'w', encoding='utf-8') as f:
-                f.write("# Report Generation Failed\n\n" + error_msg)
\ No newline at end of file
+            await write_text_async(root_dir / "technical_architecture.md", "# Report Generation Failed\n\n" + error_msg)
\ No newline at end of file
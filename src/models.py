@@ -1,7 +1,25 @@
 from dataclasses import dataclass
 
-@dataclass
+MAX_ERROR_MSG = 4 * 1024  # UTF-8 bytes
+_TRUNCATION_MARKER = "\n...[truncated]...\n"
+
+@dataclass(slots=True, frozen=True)
 class ProcessingError:
     file_path: str
     error_type: str
-    error_msg: str
\ No newline at end of file
+    error_msg: str
+
+    def __post_init__(self):
+        # Keep both ends: the prompt excerpt leads, the actual error trails
+        encoded = self.error_msg.encode('utf-8')
+        if len(encoded) > MAX_ERROR_MSG:
+            budget = MAX_ERROR_MSG - len(_TRUNCATION_MARKER.encode('utf-8'))
+            head = budget // 2
+            tail = budget - head
+            # Byte slices may split a character; drop the partial bytes
+            truncated = (
+                encoded[:head].decode('utf-8', errors='ignore')
+                + _TRUNCATION_MARKER
+                + encoded[-tail:].decode('utf-8', errors='ignore')
+            )
+            object.__setattr__(self, 'error_msg', truncated)
\ No newline at end of file
@@ -1,25 +1,104 @@
+import os
 import re
+import json
+import zlib
+import asyncio
+import hashlib
 import logging
+import threading
+from collections import deque
+from typing import Tuple
+
+try:
+    import orjson
+except ImportError:  # Optional speedup; stdlib json is used otherwise
+    orjson = None
+
+try:
+    import zstandard
+except ImportError:  # Optional; stdlib zlib is used otherwise
+    zstandard = None
+
+_ZSTD_MAGIC = b'\x28\xb5\x2f\xfd'
+
+_LINE_COMMENT_RE = re.compile(r'//[^\n]*')
+_BLANK_LINES_RE = re.compile(r'\n\s*\n')
+# Approximates BPE splits on code: identifier words, numbers, symbols, line breaks
+_TOKEN_RE = re.compile(r'[A-Z]?[a-z]+|[A-Z]+(?![a-z])|\d+|\n[ \t]*|[^\sA-Za-z\d]')
 
 def preprocess_code(code: str) -> str:
     """Clean code while preserving structure"""
     try:
-        lines = []
-        for line in code.split('\n'):
-            stripped = line.strip()
-            if stripped.startswith('//'):
-                continue
-            if '//' in line:
-                line = line.split('//')[0]
-            if line.strip():
-                lines.append(line)
-        
-        cleaned = '\n'.join(lines)
-        return re.sub(r'\n{3,}', '\n\n', cleaned)
+        # Remove comments but keep #regions and #defines, then drop blank lines
+        # Newline sentinels let leading/trailing blank lines collapse in the same pass
+        cleaned = _BLANK_LINES_RE.sub('\n', '\n' + _LINE_COMMENT_RE.sub('', code) + '\n')
+        return cleaned[1:-1]
     except Exception as e:
         logging.warning(f"Preprocessing error: {str(e)}")
         return code
     
+def estimate_tokens(text: str) -> int:
+    """Estimate the LLM token count of source text without a tokenizer"""
+    return len(_TOKEN_RE.findall(text))
+
+def prepare_code(code: str) -> Tuple[str, int, str]:
+    """Clean code, estimate its tokens and hash it in one call (picklable for process pools)"""
+    cleaned = preprocess_code(code)
+    digest = hashlib.blake2b(cleaned.encode('utf-8'), digest_size=16).hexdigest()
+    return cleaned, estimate_tokens(cleaned), digest
+
+def json_loads(data):
+    """Parse JSON from str or bytes, preferring orjson when installed"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def json_dumps(obj, indent: bool = False) -> bytes:
+    """Serialize to UTF-8 JSON bytes, preferring orjson when installed"""
+    if orjson is not None:
+        return orjson.dumps(obj, option=orjson.OPT_INDENT_2 if indent else 0)
+    return json.dumps(obj, indent=2 if indent else None, ensure_ascii=False).encode('utf-8')
+
+def compress_text(text: str) -> bytes:
+    """Compress text with zstd when installed, zlib otherwise"""
+    data = text.encode('utf-8')
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=3).compress(data)
+    return zlib.compress(data, 6)
+
+def decompress_text(data: bytes) -> str:
+    """Inverse of compress_text; the codec is detected from the frame header"""
+    if data.startswith(_ZSTD_MAGIC):
+        if zstandard is None:
+            raise ValueError("zstd-compressed data but zstandard is not installed")
+        return zstandard.ZstdDecompressor().decompress(data).decode('utf-8')
+    return zlib.decompress(data).decode('utf-8')
+
+def _write_parts(path, parts):
+    # Write to a sibling temp file and swap it in, so an interrupted run never
+    # leaves a truncated file behind that later runs would reuse
+    tmp_path = os.path.join(
+        os.path.dirname(path), f".{os.path.basename(path)}.{os.getpid()}.{threading.get_ident()}.tmp"
+    )
+    try:
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            for part in parts:
+                f.write(part)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+async def write_text_async(path, *parts: str):
+    """Write text parts to a file from a worker thread, keeping the event loop free"""
+    await asyncio.to_thread(_write_parts, path, parts)
+
+async def read_text_async(path) -> str:
+    return await asyncio.to_thread(path.read_text, encoding='utf-8')
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -28,3 +107,63 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 start_from = 0
+
+class CreditSemaphore:
+    """Semaphore whose permits are weighted credits refunded after a delay.
+
+    Mirrors a per-minute quota: each request spends credits (e.g. estimated
+    tokens) that only become available again once ``refund_time`` elapses.
+    """
+    def __init__(self, total_credits: int):
+        self.total_credits = total_credits
+        self._available = total_credits
+        self._waiters = deque()
+
+    async def acquire(self, credits: int) -> int:
+        # A single request larger than the budget would otherwise wait forever
+        credits = max(0, min(credits, self.total_credits))
+        if not self._waiters and self._available >= credits:
+            self._available -= credits
+            return credits
+        
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((credits, future))
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                self.release(credits)
+            else:
+                # Leaving the head of the queue may unblock the waiters behind it
+                try:
+                    self._waiters.remove((credits, future))
+                except ValueError:
+                    pass  # already dropped by release()
+                self.release(0)
+            raise
+        return credits
+
+    def release(self, credits: int):
+        self._available = min(self.total_credits, self._available + credits)
+        while self._waiters:
+            needed, future = self._waiters[0]
+            if future.done():
+                self._waiters.popleft()
+                continue
+            if needed > self._available:
+                break
+            self._waiters.popleft()
+            self._available -= needed
+            future.set_result(None)
+
+    async def transact(self, coro, credits: int, refund_time: float):
+        """Await ``coro`` once ``credits`` are available; refund them later"""
+        try:
+            credits = await self.acquire(credits)
+        except BaseException:
+            coro.close()
+            raise
+        try:
+            return await coro
+        finally:
+            asyncio.get_running_loop().call_later(refund_time, self.release, credits)
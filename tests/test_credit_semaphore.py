@@ -0,0 +1,82 @@
+import asyncio
+import unittest
+
+from src.utils import CreditSemaphore
+
+
+class CreditSemaphoreTest(unittest.IsolatedAsyncioTestCase):
+    async def test_waiters_are_served_in_fifo_order(self):
+        sem = CreditSemaphore(10)
+        await sem.acquire(10)
+        order = []
+
+        async def waiter(name, credits):
+            await sem.acquire(credits)
+            order.append(name)
+
+        first = asyncio.create_task(waiter("first", 6))
+        await asyncio.sleep(0)
+        second = asyncio.create_task(waiter("second", 4))
+        await asyncio.sleep(0)
+
+        # Enough for the second waiter, but it must not overtake the first
+        sem.release(4)
+        await asyncio.sleep(0)
+        self.assertEqual(order, [])
+
+        sem.release(6)
+        await asyncio.gather(first, second)
+        self.assertEqual(order, ["first", "second"])
+
+    async def test_cancelled_waiter_does_not_hold_credits(self):
+        sem = CreditSemaphore(10)
+        await sem.acquire(10)
+
+        waiter = asyncio.create_task(sem.acquire(5))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+
+        sem.release(10)
+        self.assertEqual(await asyncio.wait_for(sem.acquire(10), timeout=1), 10)
+
+    async def test_cancelled_head_waiter_unblocks_next_waiter(self):
+        sem = CreditSemaphore(10)
+        await sem.acquire(8)
+
+        head = asyncio.create_task(sem.acquire(5))
+        await asyncio.sleep(0)
+        behind = asyncio.create_task(sem.acquire(1))
+        await asyncio.sleep(0)
+        self.assertFalse(behind.done())
+
+        # Two credits are free; only the cancelled head was holding the queue
+        head.cancel()
+        with self.assertRaises(asyncio.CancelledError):
+            await head
+        self.assertEqual(await asyncio.wait_for(behind, timeout=1), 1)
+
+    async def test_oversized_request_is_clamped_to_capacity(self):
+        sem = CreditSemaphore(10)
+        self.assertEqual(await asyncio.wait_for(sem.acquire(50), timeout=1), 10)
+
+    async def test_credits_are_refunded_after_refund_time(self):
+        sem = CreditSemaphore(10)
+
+        async def job():
+            return "done"
+
+        result = await sem.transact(job(), credits=10, refund_time=0.1)
+        self.assertEqual(result, "done")
+
+        # Still spent right after the transaction finishes
+        with self.assertRaises(asyncio.TimeoutError):
+            await asyncio.wait_for(sem.acquire(10), timeout=0.02)
+
+        await asyncio.sleep(0.1)
+        self.assertEqual(await asyncio.wait_for(sem.acquire(10), timeout=1), 10)
+
+
+if __name__ == "__main__":
+    unittest.main()
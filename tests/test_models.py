@@ -0,0 +1,19 @@
+import unittest
+
+from src.models import MAX_ERROR_MSG, ProcessingError
+
+
+class ProcessingErrorTest(unittest.TestCase):
+    def test_short_message_is_kept(self):
+        error = ProcessingError("a.cs", "AnalysisError", "boom")
+        self.assertEqual(error.error_msg, "boom")
+
+    def test_long_message_fits_byte_budget_and_keeps_tail(self):
+        msg = "é漢" * 3000 + "Error: timeout"
+        error = ProcessingError("a.cs", "AnalysisError", msg)
+        self.assertLessEqual(len(error.error_msg.encode('utf-8')), MAX_ERROR_MSG)
+        self.assertTrue(error.error_msg.endswith("Error: timeout"))
+
+
+if __name__ == "__main__":
+    unittest.main()